@@ -1,10 +1,22 @@
 import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import html
 import logging
-from typing import Dict, List, Optional
-
-from bs4 import BeautifulSoup
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterator, List, Optional
+
+from cachetools import TTLCache
+import orjson
 import requests
-from telegram import Chat, ParseMode, Update
+from requests.adapters import HTTPAdapter
+from selectolax.lexbor import LexborCSSSelector, LexborHTMLParser
+from telegram import Bot, Chat, ParseMode, Update
+from telegram.error import RetryAfter
+import telegram.utils.request
 from telegram.ext import (
     CallbackContext,
     CommandHandler,
@@ -15,10 +27,11 @@ from telegram.ext import (
 
 
 # AO3 story URLS look like https://archiveofourown.org/works/WORK_ID[/chapters/CHAPTER_ID]
-AO3_STORY_URL_STARTS = [
-    "https://archiveofourown.org/works",
-    "archiveofourown.org/works",
-]
+# the query string is kept, since e.g. ?view_adult=true is needed to see tags on adult works
+AO3_STORY_URL_RE = re.compile(
+    r"(?<![\w./-])(?:https?://)?(?:www\.)?archiveofourown\.org"
+    r"/works/\d+(?:/chapters/\d+)?(?:\?[\w=&%+-]*)?"
+)
 
 # seconds to wait for responses from AO3
 REQUEST_TIMEOUT = 15
@@ -26,12 +39,244 @@ REQUEST_TIMEOUT = 15
 # maximum message length allowed by the telegram API
 MAXIMUM_MESSAGE_LENGTH = 4096
 
+# classes of the AO3 <dd>s holding story metadata, mapped to their keys in tag_info
+STAT_CLASSES = {
+    "words": "words",
+    "chapters": "chapters",
+}
+TAG_LIST_CLASSES = {
+    "rating": "rating",
+    "warning": "warnings",
+    "category": "categories",
+    "fandom": "fandoms",
+    "relationship": "relationships",
+    "characters": "characters",
+    "freeform": "tags",
+}
+METADATA_SELECTOR = ", ".join(
+    f"dd.{tag_class}" for tag_class in [*STAT_CLASSES, *TAG_LIST_CLASSES]
+)
+
+# names of chats we've seen, by chat id; chat identity is stable, so these never expire
+CHAT_NAMES: Dict[int, Optional[str]] = {}
+
+# per-thread state for the lookup threads
+THREAD_LOCAL = threading.local()
+
+# start of the story text on AO3 story pages; everything we extract comes before it
+STORY_TEXT_MARKER = b'<div id="chapters"'
+
+# bytes to read at a time when streaming story pages
+STREAM_CHUNK_SIZE = 8192
+
+# once we have what we need from a story page, keep reading (and discarding) up to this
+# many more bytes off the wire so the connection can be reused rather than dropped
+DRAIN_LIMIT = 64 * 1024
+
+# shared session so lookups reuse keep-alive connections to AO3 instead of
+# paying for a fresh TCP + TLS handshake on every link
+SESSION = requests.Session()
+SESSION.headers["Connection"] = "keep-alive"
+# AO3 pages compress very well; requests transparently decodes both (br needs brotli)
+SESSION.headers["Accept-Encoding"] = "gzip, br"
+SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# bounds on the number of concurrent requests to AO3; the actual limit adapts
+# to how AO3 is responding, to be polite
+AO3_MIN_CONCURRENCY = 1
+AO3_INITIAL_CONCURRENCY = 4
+AO3_MAX_CONCURRENCY = 16
+
+# mean AO3 response time (in seconds) above which we back off
+AO3_TARGET_LATENCY = 2
+
+# pool for looking up multiple links from the same message in parallel
+FETCH_EXECUTOR = ThreadPoolExecutor(
+    max_workers=AO3_MAX_CONCURRENCY, thread_name_prefix="ao3-fetch"
+)
+
+# maximum number of lookups a single chat can have in FETCH_EXECUTOR at once, so that one
+# chat posting lots of links can't hold up lookups for every other chat
+CHAT_FETCH_CONCURRENCY = AO3_INITIAL_CONCURRENCY
+
+# replies to /start and /help
+START_TEXT = "Hello! I'm the AO3 Tag Bot"
+
+HELP_TEXT = """
+I respond to messages containing AO3 links with the tags of the linked story.
+
+You can DM me links or add me to a group.
+
+If you add me to a group, you will need to make me an admin to allow me to see and respond to your messages. Once you do this, I (and my operator) will be able to see all messages sent in the group. I do not store or do anything with your messages except scan them for AO3 story links.    
+
+You can view my source code here: https://github.com/voynix/AO3TagBot
+
+I support the following commands:
+/help - show this help message
+"""
+
+# global outgoing message limit imposed by the telegram API
+TELEGRAM_MESSAGES_PER_SECOND = 30
+
+# number of times to retry a message telegram asked us to slow down for
+SEND_RETRIES = 3
+
+# number of chats whose messages can be handled at the same time
+CHAT_WORKERS = 16
+
+# number of threads the dispatcher runs asynchronous handlers (the commands) on
+UPDATER_WORKERS = 32
+
+# recently extracted tags, so reposted links don't refetch the story
+TAG_CACHE_SIZE = 1024
+TAG_CACHE_TTL = 60 * 60  # seconds
+TAG_CACHE = TTLCache(maxsize=TAG_CACHE_SIZE, ttl=TAG_CACHE_TTL)
+TAG_CACHE_LOCK = threading.Lock()
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing up to `rate` acquisitions per second"""
+
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self.tokens = rate
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Take a token, blocking until one is available"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.rate, self.tokens + (now - self.last_refill) * self.rate
+                )
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+SEND_BUCKET = TokenBucket(TELEGRAM_MESSAGES_PER_SECOND)
+
+
+class AIMDLimiter:
+    """
+    Concurrency limiter whose limit is tuned by additive-increase/multiplicative-decrease
+
+    Use as a context manager around each request and `record()` how it went; call `adjust()`
+    after each batch of requests to raise the limit by 0.5 if the batch's requests were fast
+    and successful, or halve it if they were slow or failed
+    """
+
+    def __init__(
+        self, initial: float, minimum: float, maximum: float, target_latency: float
+    ) -> None:
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        # latencies recorded since the last adjustment
+        self.latencies = []
+        self.failed = False
+        self.active = 0
+        self.condition = threading.Condition()
+
+    def __enter__(self) -> "AIMDLimiter":
+        with self.condition:
+            self.condition.wait_for(lambda: self.active < int(self.limit))
+            self.active += 1
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        with self.condition:
+            self.active -= 1
+            self.condition.notify()
+
+    def record(self, latency: float, ok: bool) -> None:
+        """Record the latency of a request and whether it succeeded"""
+        with self.condition:
+            self.latencies.append(latency)
+            self.failed = self.failed or not ok
+
+    def adjust(self) -> None:
+        """Update the limit based on the requests recorded since the last adjustment"""
+        with self.condition:
+            if not self.latencies:
+                return
+            mean_latency = sum(self.latencies) / len(self.latencies)
+            if self.failed or mean_latency > self.target_latency:
+                self.limit = max(self.minimum, self.limit * 0.5)
+            else:
+                self.limit = min(self.maximum, self.limit + 0.5)
+            self.latencies = []
+            self.failed = False
+            logging.debug(
+                "Adjusted AO3 concurrency to %s (mean latency %.2fs)",
+                self.limit,
+                mean_latency,
+            )
+            self.condition.notify_all()
+
+
+AO3_LIMITER = AIMDLimiter(
+    initial=AO3_INITIAL_CONCURRENCY,
+    minimum=AO3_MIN_CONCURRENCY,
+    maximum=AO3_MAX_CONCURRENCY,
+    target_latency=AO3_TARGET_LATENCY,
+)
+
+
+class ChatTaskRunner:
+    """
+    Run tasks on a shared thread pool, off of the dispatcher thread
+
+    Tasks for the same chat run one at a time in the order they were submitted, so replies
+    stay in order within a chat, while tasks for different chats run in parallel
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="chat"
+        )
+        self.queues: Dict[int, deque] = {}
+        self.lock = threading.Lock()
+
+    def submit(self, chat_id: int, fn: Callable[..., None], *args) -> None:
+        with self.lock:
+            if chat_id in self.queues:
+                # a task for this chat is already running and will pick this up
+                self.queues[chat_id].append((fn, args))
+                return
+            self.queues[chat_id] = deque([(fn, args)])
+        self.executor.submit(self._run_chat_tasks, chat_id)
+
+    def _run_chat_tasks(self, chat_id: int) -> None:
+        while True:
+            with self.lock:
+                queue = self.queues[chat_id]
+                if not queue:
+                    del self.queues[chat_id]
+                    return
+                fn, args = queue.popleft()
+            try:
+                fn(*args)
+            except:  # keep going with the chat's remaining tasks no matter what
+                logging.exception(f"Error while handling message in chat {chat_id}")
+
+
+CHAT_TASKS = ChatTaskRunner(CHAT_WORKERS)
+
 
 def normalize_url(url: str) -> str:
-    """Add explicit HTTPS schema to schema-less links"""
-    if not url.startswith("https://"):
-        return f"https://{url}"
-    return url
+    """Add explicit HTTPS schema to schema-less and HTTP links"""
+    if url.startswith("https://"):
+        return url
+    if url.startswith("http://"):
+        return f"https://{url[len('http://'):]}"
+    return f"https://{url}"
 
 
 def find_ao3_story_urls(text: str) -> List[str]:
@@ -40,78 +285,168 @@ def find_ao3_story_urls(text: str) -> List[str]:
 
     URLs are normalized with `normalize_url()`
     """
-    links = []
-    # AO3 URLS
-    for word in text.split():
-        for link_start in AO3_STORY_URL_STARTS:
-            if word.startswith(link_start):
-                links.append(normalize_url(word))
-                break
+    links = [normalize_url(match.group(0)) for match in AO3_STORY_URL_RE.finditer(text)]
 
-    logging.debug(f"Found AO3 links {links}")
+    logging.debug("Found AO3 links %s", links)
     return links
 
 
-def get_tag(soup: BeautifulSoup, tag_class: str) -> Optional[str]:
-    tag_node = soup.find("dd", class_=tag_class)
-    if not tag_node:
-        return None
-    return tag_node.string
+def get_tags_for_story_url(url: str) -> Optional[Dict[str, str]]:
+    """
+    Return the tags for the story at `url`, reusing recently extracted tags if available
 
+    Failed lookups are not cached, so transient AO3 errors are retried on the next request
+    """
+    with TAG_CACHE_LOCK:
+        tag_info = TAG_CACHE.get(url)
+    if tag_info is not None:
+        logging.debug("Using cached tags for %s", url)
+        return tag_info
+
+    tag_info = fetch_tags_for_story_url(url)
+    if tag_info is not None:
+        with TAG_CACHE_LOCK:
+            TAG_CACHE[url] = tag_info
+    return tag_info
 
-def get_tags_from_list(soup: BeautifulSoup, tag_list_class: str) -> Optional[str]:
-    tag_list_node = soup.find("dd", class_=tag_list_class)
-    if not tag_list_node:
-        return None
-    tags = []
-    for tag_node in tag_list_node.find_all("a"):
-        tags.append(tag_node.string)
-    return ", ".join(tags)
 
+def read_story_header(chunks: Iterator[bytes]) -> bytes:
+    """
+    Read the body of a streamed response from `chunks` up until the start of the (potentially
+    very long) story text, so that only the header, metadata and preface are downloaded and
+    parsed
+    """
+    page = bytearray()
+    for chunk in chunks:
+        # the marker may straddle the previous chunk and this one
+        search_start = max(0, len(page) - len(STORY_TEXT_MARKER) + 1)
+        page += chunk
+        end = page.find(STORY_TEXT_MARKER, search_start)
+        if end != -1:
+            return bytes(page[:end])
+    return bytes(page)
+
+
+def drain_response(response: requests.Response, chunks: Iterator[bytes]) -> None:
+    """
+    Read and discard the rest of `response` from `chunks`, if that's within DRAIN_LIMIT, so
+    that its keep-alive connection goes back to the pool; longer stories are abandoned and
+    their connection dropped instead
 
-def get_tags_for_story_url(url: str) -> Optional[Dict[str, str]]:
-    logging.debug(f"Retrieving and extracting tags from {url}")
-    response = requests.get(url, timeout=REQUEST_TIMEOUT)
-    if response.status_code != 200:
-        logging.debug(f"Got non-200 status code {response.status_code} for URL {url}")
+    This is best-effort: we already have what we need, so errors just drop the connection
+    """
+    # raw.tell() counts bytes off the wire, like Content-Length (i.e. before decompression)
+    content_length = response.headers.get("Content-Length")
+    if (
+        content_length is not None
+        and int(content_length) - response.raw.tell() > DRAIN_LIMIT
+    ):
+        return
+    limit = response.raw.tell() + DRAIN_LIMIT
+    try:
+        for _ in chunks:
+            if response.raw.tell() > limit:
+                return
+    except requests.RequestException:
+        return
+
+
+def get_story_page(url: str) -> Optional[bytes]:
+    """
+    Request `url` from AO3, within and reporting back to the AO3_LIMITER, returning the page
+    up to the start of the story text, or None if AO3 didn't return the story
+    """
+    response = None
+    try:
+        with AO3_LIMITER:
+            start = time.monotonic()
+            try:
+                response = SESSION.get(url, stream=True, timeout=REQUEST_TIMEOUT)
+                # missing stories are the user's problem, not a sign AO3 is struggling
+                ok = response.status_code != 429 and response.status_code < 500
+                if response.status_code != 200:
+                    logging.debug(
+                        "Got non-200 status code %s for URL %s",
+                        response.status_code,
+                        url,
+                    )
+                    page = None
+                else:
+                    chunks = response.iter_content(STREAM_CHUNK_SIZE)
+                    page = read_story_header(chunks)
+            except requests.RequestException:
+                AO3_LIMITER.record(time.monotonic() - start, ok=False)
+                raise
+            AO3_LIMITER.record(time.monotonic() - start, ok=ok)
+        # the rest of the page is only read to reuse the connection, so it doesn't count
+        # towards the latency or hold up other requests to AO3
+        if page is not None:
+            drain_response(response, chunks)
+    finally:
+        if response is not None:
+            response.close()
+    return page
+
+
+def get_css_selector() -> LexborCSSSelector:
+    """
+    Return this thread's CSS selector engine
+
+    selectolax sets up a new selector engine for every page it parses; reusing one per thread
+    instead saves that setup on every lookup
+    """
+    selector = getattr(THREAD_LOCAL, "css_selector", None)
+    if selector is None:
+        selector = THREAD_LOCAL.css_selector = LexborCSSSelector()
+    return selector
+
+
+def fetch_tags_for_story_url(url: str) -> Optional[Dict[str, str]]:
+    logging.debug("Retrieving and extracting tags from %s", url)
+    page = get_story_page(url)
+    if page is None:
         return None
-    soup = BeautifulSoup(response.text, "html.parser")
+    tree = LexborHTMLParser(page)
+    selector = get_css_selector()
 
     # this is where the fun begins!
     tag_info = {}
-    title_node = soup.find("h2", class_="title")
-    if title_node:
-        tag_info["title"] = title_node.string.strip()
-    author_node = soup.find("a", rel="author")
-    if author_node:
-        tag_info["author"] = author_node.string
-    tag_info["words"] = get_tag(soup, "words")
-    tag_info["chapters"] = get_tag(soup, "chapters")
-    tag_info["rating"] = get_tags_from_list(soup, "rating")
-    tag_info["warnings"] = get_tags_from_list(soup, "warning")
-    tag_info["categories"] = get_tags_from_list(soup, "category")
-    tag_info["fandoms"] = get_tags_from_list(soup, "fandom")
-    tag_info["relationships"] = get_tags_from_list(soup, "relationship")
-    tag_info["characters"] = get_tags_from_list(soup, "characters")
-    tag_info["tags"] = get_tags_from_list(soup, "freeform")
-
-    # filter tags we failed to find out of tag_info
-    tag_info = {k: v for k, v in tag_info.items() if v is not None}
+    for node in selector.find("h2.title, a[rel=author]", tree.root):
+        if node.tag == "h2":
+            tag_info.setdefault("title", node.text(strip=True))
+        else:
+            tag_info.setdefault("author", node.text())
+    # walk all the metadata <dd>s once, dispatching on their class
+    tag_lists = {}
+    for node in selector.find(METADATA_SELECTOR, tree.root):
+        for tag_class in (node.attributes.get("class") or "").split():
+            if tag_class in STAT_CLASSES:
+                tag_info.setdefault(STAT_CLASSES[tag_class], node.text(strip=True))
+                break
+            if tag_class in TAG_LIST_CLASSES:
+                tag_lists.setdefault(TAG_LIST_CLASSES[tag_class], []).extend(
+                    tag_node.text() for tag_node in selector.find("a", node)
+                )
+                break
+    for key, tags in tag_lists.items():
+        if tags:
+            tag_info[key] = ", ".join(tags)
 
     return tag_info
 
 
-def get_messages_for_story(url: str, tag_info: Dict[str, str]) -> List[str]:
+def get_message_for_story(url: str, tag_info: Dict[str, str]) -> str:
     """
-    Construct the message text for the given tag_info, splitting the message text into multiple
-    messages if it exceeds the MAXIMUM_MESSAGE_LENGTH
+    Construct the message text for the given tag_info
+
+    The message is sent as HTML, so everything taken from AO3 is escaped
     """
-    message_text = ""
+    parts = []
     if "title" in tag_info:
-        message_text += f"\n<b>{tag_info['title']}</b>"
+        parts.append(f"\n<b>{html.escape(tag_info['title'], quote=False)}</b>")
         if "author" in tag_info:
-            message_text += f" by <b>{tag_info['author']}</b>"
-        message_text += "\n"
+            parts.append(f" by <b>{html.escape(tag_info['author'], quote=False)}</b>")
+        parts.append("\n")
     for key in [
         "words",
         "chapters",
@@ -124,35 +459,96 @@ def get_messages_for_story(url: str, tag_info: Dict[str, str]) -> List[str]:
         "tags",
     ]:
         if key in tag_info:
-            message_text += f"\n<b>{key.capitalize()}:</b> {tag_info[key]}"
+            tags = html.escape(tag_info[key], quote=False)
+            parts.append(f"\n<b>{key.capitalize()}:</b> {tags}")
+    message_text = "".join(parts)
     if not message_text:
-        message_text = f"Could not extract tags for {url}; is the story locked?"
+        escaped_url = html.escape(url, quote=False)
+        message_text = f"Could not extract tags for {escaped_url}; is the story locked?"
+    return message_text
+
+
+def get_message_for_url(url: str) -> str:
+    """Look up the tags for `url` and construct the message text to reply with"""
+    # URLs can contain & in their query string, which needs escaping in HTML messages
+    escaped_url = html.escape(url, quote=False)
+    try:
+        tag_info = get_tags_for_story_url(url)
+        if tag_info is None:
+            return f"Could not extract tags for {escaped_url}; does the story exist?"
+        return get_message_for_story(url, tag_info)
+    except:  # bad civilization, but this is a generic fallback for requests/selectolax exploding due to *something*
+        logging.exception(f"Could not retrieve tags for {url}")
+        return f"Internal error while retrieving tags for {escaped_url}"
+
+
+def find_line_cut(line: str) -> int:
+    """
+    Return where to cut `line`, which is too long for a single message: just after the last
+    tag separator that fits or, failing that, before any HTML entity that would be cut in half
+    """
+    separator = line.rfind(", ", 0, MAXIMUM_MESSAGE_LENGTH)
+    if separator > 0:
+        return separator + 1
+    ampersand = line.rfind("&", 0, MAXIMUM_MESSAGE_LENGTH)
+    if ampersand > 0 and ";" not in line[ampersand:MAXIMUM_MESSAGE_LENGTH]:
+        return ampersand
+    return MAXIMUM_MESSAGE_LENGTH
 
-    if len(message_text) > MAXIMUM_MESSAGE_LENGTH:
-        logging.debug(
-            f"Message for {url} exceeds maximum length {MAXIMUM_MESSAGE_LENGTH}; splitting into chunks"
-        )
-    return [
-        message_text[i : i + MAXIMUM_MESSAGE_LENGTH]
-        for i in range(0, len(message_text), MAXIMUM_MESSAGE_LENGTH)
-    ]
+
+def split_message(message_text: str) -> List[str]:
+    """
+    Split `message_text` into messages of at most MAXIMUM_MESSAGE_LENGTH, breaking between
+    lines where possible so that formatting tags aren't cut in half
+    """
+    if len(message_text) <= MAXIMUM_MESSAGE_LENGTH:
+        return [message_text]
+
+    logging.debug(
+        "Message exceeds maximum length %s; splitting into chunks",
+        MAXIMUM_MESSAGE_LENGTH,
+    )
+    messages = []
+    lines = []
+    length = 0
+    for line in message_text.split("\n"):
+        if lines and length + 1 + len(line) > MAXIMUM_MESSAGE_LENGTH:
+            messages.append("\n".join(lines))
+            lines = []
+            length = 0
+        # a line too long for a message of its own has to be cut mid-line
+        while len(line) > MAXIMUM_MESSAGE_LENGTH:
+            cut = find_line_cut(line)
+            messages.append(line[:cut])
+            line = line[cut:].lstrip(" ")
+        # telegram rejects blank messages, so don't start one with blank lines
+        if not lines and not line.strip():
+            continue
+        length += len(line) + 1 if lines else len(line)
+        lines.append(line)
+    if lines:
+        messages.append("\n".join(lines))
+    return messages
 
 
 def get_chat_name(chat: Chat) -> Optional[str]:
+    # check the cache before touching chat.full_name, which is rebuilt on every access
+    if chat.id in CHAT_NAMES:
+        return CHAT_NAMES[chat.id]
     if chat.full_name is not None:  # DMs
-        return f"DMs with '{chat.full_name}'"
-    if chat.title is not None:  # channel or (super)group
-        return f"channel or group '{chat.title}'"
-    return None
+        chat_name = f"DMs with '{chat.full_name}'"
+    elif chat.title is not None:  # channel or (super)group
+        chat_name = f"channel or group '{chat.title}'"
+    else:
+        chat_name = None
+    CHAT_NAMES[chat.id] = chat_name
+    return chat_name
 
 
 def start_command(update: Update, context: CallbackContext) -> None:
     """Respond to /start with a greeting and the /help message"""
     logging.info(f"Responding to /start in chat {get_chat_name(update.effective_chat)}")
-    context.bot.send_message(
-        chat_id=update.effective_chat.id,
-        text="Hello! I'm the AO3 Tag Bot",
-    )
+    send_rate_limited(context.bot, update.effective_chat.id, START_TEXT)
     help_command(update, context, quiet=True)
 
 
@@ -164,58 +560,80 @@ def help_command(
         logging.info(
             f"Responding to /help in chat {get_chat_name(update.effective_chat)}"
         )
-    help_text = """
-I respond to messages containing AO3 links with the tags of the linked story.
+    send_rate_limited(context.bot, update.effective_chat.id, HELP_TEXT)
 
-You can DM me links or add me to a group.
 
-If you add me to a group, you will need to make me an admin to allow me to see and respond to your messages. Once you do this, I (and my operator) will be able to see all messages sent in the group. I do not store or do anything with your messages except scan them for AO3 story links.    
-
-You can view my source code here: https://github.com/voynix/AO3TagBot
+def send_rate_limited(
+    bot: Bot, chat_id: int, text: str, parse_mode: Optional[str] = None
+) -> None:
+    """
+    Send a message, staying under TELEGRAM_MESSAGES_PER_SECOND
 
-I support the following commands:
-/help - show this help message
-"""
-    context.bot.send_message(
-        chat_id=update.effective_chat.id,
-        text=help_text,
-    )
+    If telegram rate limits us anyway, wait as long as it asks and retry up to SEND_RETRIES times
+    """
+    for attempt in range(SEND_RETRIES + 1):
+        SEND_BUCKET.acquire()
+        try:
+            bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+            return
+        except RetryAfter as e:
+            if attempt == SEND_RETRIES:
+                raise
+            logging.warning(f"Rate limited by telegram; retrying in {e.retry_after}s")
+            time.sleep(e.retry_after)
+
+
+def reply_with_tags(
+    bot: Bot, chat_id: int, chat_name: Optional[str], urls: List[str]
+) -> None:
+    """Look up the tags for `urls` and send them to the chat in a single reply"""
+    message_texts = []
+    for i in range(0, len(urls), CHAT_FETCH_CONCURRENCY):
+        batch = urls[i : i + CHAT_FETCH_CONCURRENCY]
+        message_texts.extend(FETCH_EXECUTOR.map(get_message_for_url, batch))
+    message_text = "\n\n".join(text.strip() for text in message_texts)
+    AO3_LIMITER.adjust()
+    for chunk in split_message(message_text):
+        logging.info(f"Sending message to {chat_name} for URLs {urls}")
+        send_rate_limited(bot, chat_id, chunk, parse_mode=ParseMode.HTML)
 
 
 def message_reply(update: Update, context: CallbackContext) -> None:
-    logging.debug(f"Received message in chat {get_chat_name(update.effective_chat)}")
-
-    if update.message is None:
+    # skip looking up the chat name entirely unless we're going to log it
+    debug = logging.getLogger().isEnabledFor(logging.DEBUG)
+    if debug:
         logging.debug(
-            f"Message in chat {get_chat_name(update.effective_chat)} has no available message; ignoring"
+            "Received message in chat %s", get_chat_name(update.effective_chat)
         )
+
+    if update.message is None:
+        if debug:
+            logging.debug(
+                "Message in chat %s has no available message; ignoring",
+                get_chat_name(update.effective_chat),
+            )
         return
 
     urls = find_ao3_story_urls(update.message.text)
     if urls:
-        logging.debug(f"Found AO3 URLs {urls} in message")
-        for url in urls:
-            try:
-                tag_info = get_tags_for_story_url(url)
-                if tag_info is None:
-                    message_texts = [
-                        f"Could not extract tags for {url}; does the story exist?"
-                    ]
-                else:
-                    message_texts = get_messages_for_story(url, tag_info)
-            except:  # bad civilization, but this is a generic fallback for requests/BS4 exploding due to *something*
-                logging.exception(f"Could not retrieve tags for {url}")
-                message_texts = [f"Internal error while retrieving tags for {url}"]
-
-            for message_text in message_texts:
-                logging.info(
-                    f"Sending message to {get_chat_name(update.effective_chat)} for URL {url}"
-                )
-                context.bot.send_message(
-                    chat_id=update.effective_chat.id,
-                    text=message_text,
-                    parse_mode=ParseMode.HTML,
-                )
+        logging.debug("Found AO3 URLs %s in message", urls)
+        chat_id = update.effective_chat.id
+        CHAT_TASKS.submit(
+            chat_id,
+            reply_with_tags,
+            context.bot,
+            chat_id,
+            get_chat_name(update.effective_chat),
+            urls,
+        )
+
+
+def use_orjson_for_telegram() -> None:
+    """Make python-telegram-bot (de)serialize its API requests with orjson instead of json"""
+    telegram.utils.request.json = SimpleNamespace(
+        dumps=lambda obj: orjson.dumps(obj).decode("utf-8"),
+        loads=orjson.loads,
+    )
 
 
 def main() -> None:
@@ -248,11 +666,13 @@ def main() -> None:
         format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
         level=args.log_level,
     )
-    updater = Updater(token=args.token)
+    use_orjson_for_telegram()
+    updater = Updater(token=args.token, workers=UPDATER_WORKERS)
     dispatcher = updater.dispatcher
 
-    dispatcher.add_handler(CommandHandler("start", start_command))
-    dispatcher.add_handler(CommandHandler("help", help_command))
+    # commands can wait on the telegram rate limit, so don't block the dispatcher on them
+    dispatcher.add_handler(CommandHandler("start", start_command, run_async=True))
+    dispatcher.add_handler(CommandHandler("help", help_command, run_async=True))
 
     dispatcher.add_handler(
         MessageHandler(Filters.text & ~Filters.command, message_reply)